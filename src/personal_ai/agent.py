@@ -1,24 +1,46 @@
-"""Agent: system prompt + history, agentic loop with tool execution and structured logging."""
+"""Agent: system prompt + history, agentic loop with tool execution, model routing and structured logging."""
 import json
 import os
+import re
+import time
+from collections.abc import Iterable
 from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
 from . import log_utils
 from . import metrics
-from .workspace import load_system_prompt
+from . import routing
 from .tools import TOOL_IMPLEMENTATIONS, OPENAI_TOOLS
 
 load_dotenv()
-MODEL = os.getenv("LLM_MODEL", "")
 BASE_URL = os.getenv("LLM_BASE_URL", "")
+# Routing hint for the provider's prompt cache (OpenAI prompt_cache_key); on by default for api.openai.com
+PROMPT_CACHE_KEY = os.getenv("LLM_PROMPT_CACHE_KEY", "") or ("personal-ai" if "api.openai.com" in BASE_URL else "")
 
 
-def run_tool(name: str, arguments: dict) -> str:
+# exec_command appends this line when the command exits non-zero
+_EXIT_CODE = re.compile(r"\nExit code: -?\d+$")
+# Error strings each tool returns itself; other output (file contents, pages) may start with "Error" too
+_TOOL_ERROR_PREFIXES = {
+    "read_file": ("Error: not a file or not found:", "Error: file too large"),
+    "browse": ("Error: url is required.", "Error: invalid url.", "Error loading page:", "Error converting HTML"),
+    "exec_command": ("Error: command timed out",),
+}
+
+
+def _tool_failed(name: str, result: str) -> bool:
+    """True if a tool's own result reports failure (for exec_command: also a non-zero exit code)."""
+    if name == "exec_command" and _EXIT_CODE.search(result):
+        return True
+    return result.startswith(_TOOL_ERROR_PREFIXES.get(name, ("Error",)))
+
+
+def run_tool(name: str, arguments: dict) -> tuple[str, bool]:
+    """Run a tool. Returns (result, failed)."""
     impl = TOOL_IMPLEMENTATIONS.get(name)
     if not impl:
-        return f"Error: unknown tool {name}"
+        return f"Error: unknown tool {name}", True
     log_utils.log_tool_call(name, arguments)
     try:
         if name == "update_user_profile":
@@ -27,47 +49,83 @@ def run_tool(name: str, arguments: dict) -> str:
             result = impl(arguments["path"])
         elif name == "write_file":
             result = impl(arguments["path"], arguments["content"])
+        elif name == "edit_file":
+            result = impl(arguments["path"], edits=arguments.get("edits"), diff=arguments.get("diff"))
         elif name == "search_files":
             result = impl(arguments["directory"], arguments["pattern"])
         elif name == "exec_command":
             result = impl(arguments["command"])
         else:
             result = impl(**arguments)
+        failed = _tool_failed(name, result)
     except Exception as e:
         result = f"Error: {e}"
+        failed = True
     log_utils.log_tool_result(name, result)
-    return result
+    return result, failed
+
+
+def _cached_tokens(usage: object) -> int:
+    """Prompt tokens served from the provider's cache, if the usage object reports them."""
+    for attr in ("prompt_tokens_details", "input_tokens_details"):
+        details = getattr(usage, attr, None)
+        if details is None:
+            continue
+        if isinstance(details, dict):
+            return int(details.get("cached_tokens") or 0)
+        return int(getattr(details, "cached_tokens", 0) or 0)
+    return 0
 
 
 def chat(
     client: OpenAI,
     system_prompt: str,
-    history: list[dict],
+    history: Iterable[dict],
     user_message: str,
     request_id: str,
     session_path: Path | None = None,
+    memory_prompt: str = "",
 ) -> tuple[str, list[dict]]:
-    """Run agentic loop. Returns (final_assistant_text, messages_to_append_to_session)."""
+    """Run agentic loop. Returns (final_assistant_text, messages_to_append_to_session).
+
+    Request layout is kept prefix-stable for provider prompt caching: the static OPENAI_TOOLS
+    and system prompt lead, then history. Volatile memory_prompt is attached to the new user
+    message, and that exact content is what the session stores, so later requests replay
+    byte-identical history and a profile update leaves the cached prefix intact.
+    """
     log_utils.set_request_id(request_id)
     messages = [{"role": "system", "content": system_prompt}]
     messages.extend(history)
-    messages.append({"role": "user", "content": user_message})
-    to_append = [{"role": "user", "content": user_message}]
+    content = f"{memory_prompt}\n\nMessage:\n{user_message}" if memory_prompt else user_message
+    messages.append({"role": "user", "content": content})
+    to_append = [{"role": "user", "content": content}]
+    iteration = 0
+    last_tool_failed = False
+    escalating = False
+    extra = {"extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY}} if PROMPT_CACHE_KEY else {}
 
     while True:
-        log_utils.log_llm_request(MODEL, messages)
+        step = "final" if escalating else routing.step_for(iteration, last_tool_failed)
+        model = routing.STRONG_MODEL if escalating else routing.model_for(step)
+        max_tokens = routing.max_tokens_for(model)
+        iteration += 1
+        log_utils.log_llm_request(model, messages)
+        started = time.perf_counter()
         resp = client.chat.completions.create(
-            model=MODEL,
+            model=model,
             messages=messages,
             tools=OPENAI_TOOLS,
+            **({"max_tokens": max_tokens} if max_tokens else {}),
+            **extra,
         )
+        latency_ms = (time.perf_counter() - started) * 1000
+        input_tokens = output_tokens = cached_tokens = 0
         if getattr(resp, "usage", None) is not None:
             u = resp.usage
-            metrics.record_usage(
-                session_path,
-                getattr(u, "prompt_tokens", 0) or getattr(u, "input_tokens", 0),
-                getattr(u, "completion_tokens", 0) or getattr(u, "output_tokens", 0),
-            )
+            input_tokens = getattr(u, "prompt_tokens", 0) or getattr(u, "input_tokens", 0)
+            output_tokens = getattr(u, "completion_tokens", 0) or getattr(u, "output_tokens", 0)
+            cached_tokens = _cached_tokens(u)
+            metrics.record_usage(session_path, input_tokens, output_tokens, cached_tokens)
         choice = resp.choices[0]
         msg = choice.message
         tool_calls = getattr(msg, "tool_calls", None) or []
@@ -79,6 +137,16 @@ def chat(
                 for tc in tool_calls
             ]
         log_utils.log_llm_response(response_msg, len(tool_calls))
+        truncated = bool(max_tokens) and getattr(choice, "finish_reason", None) == "length"
+        discard = not escalating and (truncated or not tool_calls) and routing.should_escalate(model, truncated)
+        metrics.record_model_call(
+            model, input_tokens, output_tokens, latency_ms, cached_tokens, step, discarded=discard
+        )
+        if discard:
+            # Fast model answered or was cut off; re-ask the strong model once with the same context
+            escalating = True
+            continue
+        escalating = False
         if not tool_calls:
             final = (msg.content or "").strip()
             to_append.append({"role": "assistant", "content": final})
@@ -92,13 +160,15 @@ def chat(
         messages.append(assistant_msg)
         to_append.append(assistant_msg)
 
+        last_tool_failed = False
         for tc in tool_calls:
             name = tc.function.name
             try:
                 args = json.loads(tc.function.arguments)
             except json.JSONDecodeError:
                 args = {}
-            result = run_tool(name, args)
+            result, failed = run_tool(name, args)
+            last_tool_failed = last_tool_failed or failed
             messages.append({"role": "tool", "tool_call_id": tc.id, "content": result})
             to_append.append({"role": "tool", "tool_call_id": tc.id, "content": result})
 
@@ -19,7 +19,7 @@ def main() -> None:
         return
     client = agent.create_client(api_key)
     session_path = session.start_session()
-    history = session.load_history(session_path)
+    history = session.SessionHistory(session_path)
     print(f"Session: {session_path.name}")
     print('Say "exit" or "quit" to end.\n')
 
@@ -34,10 +34,10 @@ def main() -> None:
             break
         request_id = str(uuid.uuid4())
         system_prompt = workspace.load_system_prompt()
+        memory_prompt = workspace.load_memory_prompt()
         reply, to_append = agent.chat(
-            client, system_prompt, history, user_input, request_id, session_path
+            client, system_prompt, history, user_input, request_id, session_path, memory_prompt
         )
-        session.append_messages(session_path, to_append)
         history.extend(to_append)
         print(f"Agent: {reply}\n")
 
@@ -1,4 +1,4 @@
-"""LLM token metrics: total (global) and per-session, stored in workspace/metrics/."""
+"""LLM token metrics: total (global), per-session and per-model, stored in workspace/metrics/."""
 import json
 from pathlib import Path
 
@@ -6,25 +6,27 @@ from .workspace import WORKSPACE_DIR
 
 METRICS_DIR = WORKSPACE_DIR / "metrics"
 TOTAL_FILE = METRICS_DIR / "total.json"
+MODELS_FILE = METRICS_DIR / "models.json"
+# Recent calls kept per model and routing step (older samples drop off)
+RECENT_WINDOW = 20
 
 
 def ensure_metrics_dir() -> None:
     METRICS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+COUNT_KEYS = ("input_tokens", "cached_tokens", "output_tokens", "total_tokens")
+
+
 def _read_counts(path: Path) -> dict[str, int]:
-    """Read JSON file with input_tokens, output_tokens, total_tokens; return zeros if missing."""
+    """Read JSON file with COUNT_KEYS token counts; return zeros if missing."""
     if not path.exists():
-        return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        return {k: 0 for k in COUNT_KEYS}
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
-        return {
-            "input_tokens": int(data.get("input_tokens", 0)),
-            "output_tokens": int(data.get("output_tokens", 0)),
-            "total_tokens": int(data.get("total_tokens", 0)),
-        }
+        return {k: int(data.get(k, 0)) for k in COUNT_KEYS}
     except (json.JSONDecodeError, OSError):
-        return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        return {k: 0 for k in COUNT_KEYS}
 
 
 def _write_counts(path: Path, counts: dict[str, int]) -> None:
@@ -36,9 +38,12 @@ def record_usage(
     session_path: Path | None,
     input_tokens: int,
     output_tokens: int,
+    cached_tokens: int = 0,
 ) -> None:
     """Record token usage: update global total and, if session_path given, session file.
 
+    cached_tokens is the part of input_tokens the provider served from its prompt cache.
+
     - Total: workspace/metrics/total.json (cumulative across all sessions).
     - Session: workspace/metrics/<session_stem>.json (e.g. session_2026-02-23T01-26-44.json).
     """
@@ -48,6 +53,7 @@ def record_usage(
     # Update total
     counts = _read_counts(TOTAL_FILE)
     counts["input_tokens"] += input_tokens
+    counts["cached_tokens"] += cached_tokens
     counts["output_tokens"] += output_tokens
     counts["total_tokens"] += total
     _write_counts(TOTAL_FILE, counts)
@@ -57,6 +63,7 @@ def record_usage(
         session_file = METRICS_DIR / f"{session_path.stem}.json"
         counts = _read_counts(session_file)
         counts["input_tokens"] += input_tokens
+        counts["cached_tokens"] += cached_tokens
         counts["output_tokens"] += output_tokens
         counts["total_tokens"] += total
         _write_counts(session_file, counts)
@@ -72,3 +79,49 @@ def get_session_usage(session_path: Path) -> dict[str, int]:
     """Return token counts for the given session file."""
     session_file = METRICS_DIR / f"{session_path.stem}.json"
     return _read_counts(session_file)
+
+
+def record_model_call(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    latency_ms: float,
+    cached_tokens: int = 0,
+    step: str = "",
+    discarded: bool = False,
+) -> None:
+    """Record one completion for model in workspace/metrics/models.json (calls, tokens, latency).
+
+    discarded marks a reply that was thrown away and re-asked to another model; those are also
+    summed under escalations / discarded_tokens / discarded_latency_ms. If step is given, the call
+    is kept in recent[step] as [latency_ms, input + output tokens, discarded], last RECENT_WINDOW calls.
+    """
+    ensure_metrics_dir()
+    stats = get_model_stats()
+    entry = stats.setdefault(model, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "latency_ms": 0})
+    entry["calls"] += 1
+    entry["input_tokens"] += input_tokens
+    entry["cached_tokens"] = entry.get("cached_tokens", 0) + cached_tokens
+    entry["output_tokens"] += output_tokens
+    entry["latency_ms"] += int(latency_ms)
+    if discarded:
+        entry["escalations"] = entry.get("escalations", 0) + 1
+        entry["discarded_tokens"] = entry.get("discarded_tokens", 0) + input_tokens + output_tokens
+        entry["discarded_latency_ms"] = entry.get("discarded_latency_ms", 0) + int(latency_ms)
+    if step:
+        recent = entry.setdefault("recent", {}).setdefault(step, [])
+        recent.append([int(latency_ms), input_tokens + output_tokens, int(discarded)])
+        del recent[:-RECENT_WINDOW]
+    MODELS_FILE.write_text(json.dumps(stats, indent=2), encoding="utf-8")
+
+
+def get_model_stats() -> dict[str, dict]:
+    """Return per-model stats: cumulative calls, input/cached/output tokens, latency_ms (sum),
+    discarded-call totals, and recent (step -> [latency_ms, tokens, discarded] per call)."""
+    if not MODELS_FILE.exists():
+        return {}
+    try:
+        data = json.loads(MODELS_FILE.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
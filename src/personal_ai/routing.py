@@ -0,0 +1,106 @@
+"""Model routing: fast model for tool-selection turns, strong model for final answers and recovery."""
+import os
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+_DEFAULT_MODEL = os.getenv("LLM_MODEL", "")
+FAST_MODEL = os.getenv("LLM_FAST_MODEL", "") or _DEFAULT_MODEL
+STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "") or _DEFAULT_MODEL
+# Output cap for fast-model calls: they only pick the next tool. 0 disables the cap.
+FAST_MAX_TOKENS = int(os.getenv("LLM_FAST_MAX_TOKENS", "") or 1024)
+# Recent "tools" calls needed per model before the stats may veto the fast model
+MIN_SAMPLES = 5
+# Optional fast/strong price per token (e.g. 0.1); when set, routing must also save spend
+FAST_COST_RATIO = float(os.getenv("LLM_FAST_COST_RATIO", "") or 0)
+# Every Nth "tools" decision goes to the other model so both latency windows stay current
+PROBE_EVERY = 10
+
+# Step -> tier. first: iteration with only the user message; tools: iteration after tool
+# results; final: model that must produce the answer text; error: iteration after a failed tool.
+TIERS = ("fast", "strong")
+DEFAULT_RULES = {"first": "strong", "tools": "fast", "final": "strong", "error": "strong"}
+
+_tools_decisions = 0
+
+
+def _parse_rules(raw: str) -> dict[str, str]:
+    """Parse LLM_ROUTING_RULES like "first=fast,final=strong"; unknown steps/tiers are ignored."""
+    rules = dict(DEFAULT_RULES)
+    for part in raw.split(","):
+        step, _, tier = part.partition("=")
+        step, tier = step.strip().lower(), tier.strip().lower()
+        if step in rules and tier in TIERS:
+            rules[step] = tier
+    return rules
+
+
+RULES = _parse_rules(os.getenv("LLM_ROUTING_RULES", ""))
+
+
+def routing_enabled() -> bool:
+    return FAST_MODEL != STRONG_MODEL
+
+
+def _recent(stats: dict, model: str, step: str) -> list[list[int]]:
+    return ((stats.get(model) or {}).get("recent") or {}).get(step) or []
+
+
+def fast_model_pays_off() -> bool:
+    """False while recent "tools" calls show the fast model costs more than it saves.
+
+    Each kept fast call saves (strong average - its latency); each discarded fast reply (re-asked
+    to the strong model) wastes its whole latency. With LLM_FAST_COST_RATIO set, the fast model's
+    tokens at that price, discarded ones included, must also undercut the kept calls' tokens at
+    strong price. Only same-step windows are compared, so long final answers do not skew it.
+    """
+    stats = metrics.get_model_stats()
+    fast = _recent(stats, FAST_MODEL, "tools")
+    strong = _recent(stats, STRONG_MODEL, "tools")
+    if len(fast) < MIN_SAMPLES or len(strong) < MIN_SAMPLES:
+        return True
+    strong_ms = sum(r[0] for r in strong) / len(strong)
+    kept = [r for r in fast if not r[2]]
+    saved_ms = sum(strong_ms - r[0] for r in kept)
+    wasted_ms = sum(r[0] for r in fast if r[2])
+    if saved_ms <= wasted_ms:
+        return False
+    if FAST_COST_RATIO > 0:
+        return FAST_COST_RATIO * sum(r[1] for r in fast) < sum(r[1] for r in kept)
+    return True
+
+
+def step_for(iteration: int, last_tool_failed: bool = False) -> str:
+    """Routing step for this loop iteration (0 = first call of the turn)."""
+    if last_tool_failed:
+        return "error"
+    return "first" if iteration == 0 else "tools"
+
+
+def model_for(step: str) -> str:
+    """Model for a routing step; "tools" steps occasionally probe the other model."""
+    global _tools_decisions
+    if not routing_enabled() or RULES[step] == "strong":
+        return STRONG_MODEL
+    model = FAST_MODEL if fast_model_pays_off() else STRONG_MODEL
+    if step == "tools":
+        _tools_decisions += 1
+        if _tools_decisions % PROBE_EVERY == 0:
+            model = STRONG_MODEL if model == FAST_MODEL else FAST_MODEL
+    return model
+
+
+def max_tokens_for(model: str) -> int | None:
+    """Output cap for model, or None for no cap."""
+    if routing_enabled() and model == FAST_MODEL and FAST_MAX_TOKENS > 0:
+        return FAST_MAX_TOKENS
+    return None
+
+
+def should_escalate(model: str, truncated: bool = False) -> bool:
+    """True if a reply from model should be re-asked to the strong model: the fast model hit
+    its output cap, or answered while final answers belong to the strong tier. Never downward."""
+    if not routing_enabled() or model != FAST_MODEL:
+        return False
+    return truncated or RULES["final"] == "strong"
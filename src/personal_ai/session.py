@@ -1,11 +1,14 @@
-"""Session: one JSONL file per run; append messages, load history."""
+"""Session: one JSONL file per run; SessionHistory appends messages and serves history."""
 import json
+from collections.abc import Iterator
 from pathlib import Path
 from datetime import datetime, timezone
 
 from .workspace import WORKSPACE_DIR
 
 SESSIONS_DIR = WORKSPACE_DIR / "sessions"
+# Tool results whose JSONL line is larger than this stay on disk and are read back on demand
+SPILL_THRESHOLD_BYTES = 4 * 1024
 
 
 def ensure_sessions_dir() -> None:
@@ -20,20 +23,57 @@ def start_session() -> Path:
     return path
 
 
-def load_history(path: Path) -> list[dict]:
-    if not path.exists():
-        return []
-    out = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            out.append(json.loads(line))
-    return out
+class SessionHistory:
+    """Conversation history backed by the session JSONL file.
 
+    Small messages are kept in memory. Large tool results (browse pages, command output)
+    are kept only as (offset, length) into the file and streamed back, unchanged, one at a
+    time while the history is iterated to build a request, so they do not stay resident
+    between turns. extend() writes to the file and the in-memory index in one step.
+    """
 
-def append_messages(path: Path, messages: list[dict]) -> None:
-    with open(path, "a", encoding="utf-8") as f:
-        for m in messages:
-            f.write(json.dumps(m, ensure_ascii=False) + "\n")
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: list[dict | tuple[int, int]] = []
+        if path.exists():
+            offset = 0
+            with open(path, "rb") as f:
+                for raw in f:
+                    if raw.strip():
+                        self._add(json.loads(raw), raw, offset)
+                    offset += len(raw)
+
+    def _add(self, message: dict, raw: bytes, offset: int) -> None:
+        if message.get("role") == "tool" and len(raw) > SPILL_THRESHOLD_BYTES:
+            self._entries.append((offset, len(raw)))
+        else:
+            self._entries.append(message)
+
+    def extend(self, messages: list[dict]) -> None:
+        """Append messages to the session file and the history."""
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            for m in messages:
+                raw = (json.dumps(m, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(raw)
+                self._add(m, raw, offset)
+                offset += len(raw)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[dict]:
+        """Yield messages in order, reading spilled tool results from disk as they are reached."""
+        f = None
+        try:
+            for e in self._entries:
+                if not isinstance(e, tuple):
+                    yield e
+                    continue
+                if f is None:
+                    f = open(self.path, "rb")
+                f.seek(e[0])
+                yield json.loads(f.read(e[1]))
+        finally:
+            if f is not None:
+                f.close()
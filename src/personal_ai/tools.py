@@ -1,6 +1,8 @@
-"""Tools: read_file, write_file, search_files, exec_command, update_user_profile, browse + OpenAI schemas."""
+"""Tools: read_file, write_file, edit_file, search_files, exec_command, update_user_profile, browse + OpenAI schemas."""
+import os
 import re
 import subprocess
+import tempfile
 import yaml
 from pathlib import Path
 from urllib.parse import urlparse
@@ -119,6 +121,221 @@ def write_file(path: str, content: str) -> str:
     return f"Wrote {len(content)} bytes to {path}"
 
 
+def _atomic_write(full: Path, content: str) -> None:
+    """Write via a temp file in the same directory, then rename over the target."""
+    fd, tmp = tempfile.mkstemp(dir=full.parent, prefix=f".{full.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        if full.exists():
+            os.chmod(tmp, full.stat().st_mode)
+        os.replace(tmp, full)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _split_lines(text: str) -> list[str]:
+    """Split on "\n" only (a trailing "\r" is dropped per line); str.splitlines also breaks on \f, U+2028, etc."""
+    if not text:
+        return []
+    parts = text.split("\n")
+    if text.endswith("\n"):
+        parts.pop()
+    return [l[:-1] if l.endswith("\r") else l for l in parts]
+
+
+def _splice(lines: list[str], eols: list[str], at: int, count: int, new: list[str], newline: str) -> str:
+    """Replace lines[at:at + count] with new, keeping other lines' endings; return the applied range."""
+    no_final_eol = bool(lines) and eols[-1] == ""
+    if no_final_eol and at + count == len(lines):
+        eols[-1] = newline
+    eol = eols[at] if count and at < len(eols) else newline
+    lines[at:at + count] = new
+    eols[at:at + count] = [eol] * len(new)
+    if no_final_eol and lines:
+        eols[-1] = ""
+    if new:
+        return f"{at + 1}-{at + len(new)}"
+    return f"{at + 1} (deleted)" if count == 1 else f"{at + 1}-{at + count} (deleted)"
+
+
+def _locate(lines: list[str], block: list[str], hint: int = 0) -> tuple[list[int], bool]:
+    """Find start indices of block in lines: exact first, then ignoring surrounding whitespace.
+
+    Returns (candidates sorted by distance from hint, fuzzy).
+    """
+    n = len(block)
+    if n == 0 or n > len(lines):
+        return [], False
+    starts = range(len(lines) - n + 1)
+    found = [i for i in starts if lines[i] == block[0] and lines[i:i + n] == block]
+    fuzzy = False
+    if not found:
+        stripped = [l.strip() for l in lines]
+        target = [l.strip() for l in block]
+        found = [i for i in starts if stripped[i] == target[0] and stripped[i:i + n] == target]
+        fuzzy = True
+    return sorted(found, key=lambda i: abs(i - hint)), fuzzy
+
+
+def _reindent(new: list[str], expected: str, actual: str) -> list[str]:
+    """Shift replacement lines by the indentation difference found during a fuzzy match."""
+    want = actual[: len(actual) - len(actual.lstrip())]
+    have = expected[: len(expected) - len(expected.lstrip())]
+    if want == have or not want.startswith(have):
+        return new
+    extra = want[len(have):]
+    return [extra + l if l.strip() else l for l in new]
+
+
+_HUNK_HEADER = re.compile(r"^@@(?: -(\d+)(?:,(\d+))? \+\d+(?:,(\d+))?)? @@")
+
+
+def _parse_unified_diff(diff: str) -> list[tuple[int | None, list[str], list[str]]]:
+    """Parse unified diff text into (old_start_index, old_lines, new_lines) hunks.
+
+    A bare "@@ @@" header (no line numbers) runs to the next header; its start is None.
+    """
+    hunks = []
+    old_left = new_left = 0
+    for line in _split_lines(diff):
+        m = _HUNK_HEADER.match(line)
+        if m:
+            if m.group(1) is None:
+                old_left = new_left = float("inf")
+                hunks.append((None, [], []))
+            else:
+                old_left = int(m.group(2) or 1)
+                new_left = int(m.group(3) or 1)
+                # With an empty old side, N is the line the new lines go after
+                start = int(m.group(1)) if old_left == 0 else max(int(m.group(1)) - 1, 0)
+                hunks.append((start, [], []))
+            continue
+        # Outside a hunk body (file headers, trailing text) or a "\ No newline" marker
+        if (old_left <= 0 and new_left <= 0) or line.startswith("\\"):
+            continue
+        _, old, new = hunks[-1]
+        tag, text = line[:1], line[1:]
+        if tag in (" ", ""):
+            old.append(text)
+            new.append(text)
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            old.append(text)
+            old_left -= 1
+        elif tag == "+":
+            new.append(text)
+            new_left -= 1
+    return hunks
+
+
+def edit_file(path: str, edits: list[dict] | None = None, diff: str | None = None) -> str:
+    """Apply search/replace edits or a unified diff to a file without resending its full content.
+
+    - edits: list of {"search": old_text, "replace": new_text}; search must match exactly one place.
+    - diff: unified diff text (@@ hunks); context lines are verified, line numbers are a hint only.
+    Matching falls back to whitespace-insensitive comparison. All hunks must apply or nothing is written.
+    """
+    p = _resolve_path(path)
+    full = PROJECT_ROOT / p
+    if not full.is_file():
+        return f"Error: not a file or not found: {path}"
+    if full.stat().st_size > MAX_FILE_SIZE:
+        return f"Error: file too large (max {MAX_FILE_SIZE} bytes)"
+    if not edits and not diff:
+        return "Error: provide 'edits' (list of search/replace) or 'diff' (unified diff)."
+
+    with open(full, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    # Line contents without endings, plus each line's own ending ("" for a last line without one)
+    raw = text.split("\n")
+    eols = ["\n"] * (len(raw) - 1) + [""]
+    if len(raw) > 1 and raw[-1] == "":
+        raw.pop()
+        eols.pop()
+    lines = []
+    for i, l in enumerate(raw):
+        if eols[i] and l.endswith("\r"):
+            l, eols[i] = l[:-1], "\r\n"
+        lines.append(l)
+    newline = "\r\n" if eols.count("\r\n") > eols.count("\n") else "\n"
+
+    hunks = []
+    for e in edits or []:
+        if not isinstance(e, dict) or not e.get("search"):
+            return "Error: each edit needs a non-empty 'search' string."
+        hunks.append((None, str(e["search"]), str(e.get("replace") or "")))
+    if diff:
+        parsed = _parse_unified_diff(diff)
+        if not parsed:
+            return "Error: no @@ hunks found in diff."
+        hunks.extend(parsed)
+
+    applied = []
+    fuzzy_count = 0
+    offset = 0
+    for n, (start, old, new) in enumerate(hunks, 1):
+        if isinstance(old, str):
+            # Search/replace: exact substring first, then line-based fuzzy match below
+            old = old.replace("\r\n", "\n")
+            new = new.replace("\r\n", "\n")
+            # Include the file's final newline so whole-line searches match at the end too
+            current = "\n".join(lines) + ("\n" if lines and eols[-1] else "")
+            hits = current.count(old)
+            if hits > 1:
+                return f"Error: hunk {n} matches {hits} places in {path}; add more context."
+            if hits == 1:
+                idx = current.index(old)
+                at = current.count("\n", 0, idx)
+                # A shared trailing newline leaves the following line untouched
+                while len(old) > 1 and old.endswith("\n") and new.endswith("\n"):
+                    old, new = old[:-1], new[:-1]
+                line_start = current.rfind("\n", 0, idx) + 1
+                if idx == line_start and old.endswith("\n") and (not new or new.endswith("\n")):
+                    # Whole lines replaced (or deleted)
+                    count = old.count("\n")
+                    new_lines = new[:-1].split("\n") if new else []
+                    eats_final_eol = False
+                else:
+                    # The search may consume the file's final newline, which has no line after it
+                    eats_final_eol = idx + len(old) == len(current) and old.endswith("\n")
+                    count = min(current.count("\n", idx, idx + len(old)) + 1, len(lines) - at)
+                    seg = "\n".join(lines[at:at + count])
+                    col = idx - line_start
+                    new_lines = (seg[:col] + new + seg[col + len(old):]).split("\n")
+                applied.append(_splice(lines, eols, at, count, new_lines, newline))
+                if eats_final_eol and lines:
+                    eols[-1] = ""
+                offset += len(new_lines) - count
+                continue
+            old, new = _split_lines(old), _split_lines(new)
+        if not old:
+            # Pure insertion: only possible with a diff line number
+            if start is None:
+                return f"Error: hunk {n} has nothing to search for."
+            at = min(start + offset, len(lines))
+        else:
+            found, fuzzy = _locate(lines, old, 0 if start is None else start + offset)
+            if not found:
+                return f"Error: hunk {n} not found in {path}; nothing written."
+            if start is None and len(found) > 1:
+                return f"Error: hunk {n} matches {len(found)} places in {path}; add more context."
+            at = found[0]
+            if fuzzy:
+                fuzzy_count += 1
+                new = _reindent(new, old[0], lines[at])
+        applied.append(_splice(lines, eols, at, len(old), new, newline))
+        offset += len(new) - len(old)
+
+    content = "".join(l + e for l, e in zip(lines, eols))
+    if content != text:
+        _atomic_write(full, content)
+    note = f" ({fuzzy_count} fuzzy)" if fuzzy_count else ""
+    return f"Applied {len(applied)} hunk(s) to {path}{note}; lines {', '.join(applied)}"
+
+
 def search_files(directory: str, pattern: str) -> str:
     try:
         base = _resolve_path(directory)
@@ -226,12 +443,15 @@ def update_user_profile(updates: dict | None = None) -> str:
 TOOL_IMPLEMENTATIONS = {
     "read_file": read_file,
     "write_file": write_file,
+    "edit_file": edit_file,
     "search_files": search_files,
     "exec_command": exec_command,
     "update_user_profile": update_user_profile,
     "browse": browse,
 }
 
+# Sent unchanged with every request, ahead of the messages: keep it a static literal in a
+# fixed order so the serialized schemas stay byte-identical and the prompt prefix cache hits.
 OPENAI_TOOLS = [
     {
         "type": "function",
@@ -249,7 +469,7 @@ OPENAI_TOOLS = [
         "type": "function",
         "function": {
             "name": "write_file",
-            "description": "Write content to a file. Path under project root.",
+            "description": "Write content to a file. Path under project root. To change part of an existing file, use edit_file instead.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -260,6 +480,33 @@ OPENAI_TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "edit_file",
+            "description": "Edit part of an existing file without resending it. Pass either edits (search/replace blocks; each search must match exactly one place, include a few surrounding lines) or diff (unified diff with @@ hunks). All hunks apply or none do. Returns the applied line ranges.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "File path under project"},
+                    "edits": {
+                        "type": "array",
+                        "description": "Search/replace blocks applied in order",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "search": {"type": "string", "description": "Exact existing text to replace"},
+                                "replace": {"type": "string", "description": "Replacement text (empty to delete)"},
+                            },
+                            "required": ["search", "replace"],
+                        },
+                    },
+                    "diff": {"type": "string", "description": "Unified diff to apply (alternative to edits)"},
+                },
+                "required": ["path"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -19,9 +19,9 @@ DEFAULTS = {
     USER_MEMORY_FILE: "",
     "AGENT.md": """# Agent rules
 
-## User memory (YAML above)
+## User memory (YAML in user messages)
 
-- **Use it** — The "User:" YAML block above is long-term memory. Use it to personalize replies.
+- **Use it** — The "User:" YAML block at the start of user messages is long-term memory (the latest one is current), not something the user typed. Use it to personalize replies.
 - **Keys: snake_case** — All keys are snake_case (e.g. name, what_to_call_them, timezone). Use snake_case when updating.
 - **Update it (required)** — Whenever the user shares any personal fact or preference (name, interests, hobbies, favorites, timezone), you must call update_user_profile in the same turn with updates: { "snake_case_key": "value" }. Do not skip this when the user introduces themselves or shares preferences.
 
@@ -30,16 +30,38 @@ DEFAULTS = {
 }
 
 
+_MEMORY_HEADING = "## User memory (YAML in user messages)"
+_MEMORY_NOTE = 'The "User:" YAML block at the start of user messages is long-term memory (the latest one is current), not something the user typed.'
+# Earlier AGENT.md wording about where the memory YAML sits -> current wording
+_LEGACY_AGENT_TEXT = (
+    ("## User memory (YAML above)", _MEMORY_HEADING),
+    ("## User memory (YAML below)", _MEMORY_HEADING),
+    ("## User memory (YAML in the latest user message)", _MEMORY_HEADING),
+    ('The "User:" YAML block above is long-term memory.', _MEMORY_NOTE),
+    ('The "User:" YAML block below is long-term memory.', _MEMORY_NOTE),
+    ('The "User:" YAML block at the start of the latest user message is long-term memory, not something the user typed.', _MEMORY_NOTE),
+    ('The "User:" YAML block is long-term memory.', _MEMORY_NOTE),
+)
+
+
 def ensure_workspace() -> None:
     WORKSPACE_DIR.mkdir(parents=True, exist_ok=True)
     for name in FILES:
         p = WORKSPACE_DIR / name
         if not p.exists():
             p.write_text(DEFAULTS[name], encoding="utf-8")
+    # Existing AGENT.md may still say the memory YAML is above the rules
+    agent_path = WORKSPACE_DIR / "AGENT.md"
+    text = agent_path.read_text(encoding="utf-8")
+    updated = text
+    for old, new in _LEGACY_AGENT_TEXT:
+        updated = updated.replace(old, new)
+    if updated != text:
+        agent_path.write_text(updated, encoding="utf-8")
 
 
 def load_user_memory_yaml() -> str:
-    """Load user memory as compact YAML string for system prompt (low token use)."""
+    """Load user memory as compact YAML string for the prompt (low token use)."""
     p = WORKSPACE_DIR / USER_MEMORY_FILE
     if not p.exists():
         return ""
@@ -56,13 +78,21 @@ def load_user_memory_yaml() -> str:
 
 
 def load_system_prompt() -> str:
-    """Build system prompt: user memory (YAML) + AGENT.md. Compact for fewer tokens."""
+    """Build system prompt: AGENT.md only.
+
+    User memory is left out (see load_memory_prompt) so the system prompt, and the history
+    cached behind it, stays byte-identical across profile updates.
+    """
     ensure_workspace()
-    parts = []
-    user_yaml = load_user_memory_yaml()
-    if user_yaml:
-        parts.append("User:\n" + user_yaml.strip())
     agent_path = WORKSPACE_DIR / "AGENT.md"
-    if agent_path.exists():
-        parts.append(agent_path.read_text(encoding="utf-8"))
-    return "\n\n".join(parts)
+    if not agent_path.exists():
+        return ""
+    return agent_path.read_text(encoding="utf-8").strip()
+
+
+def load_memory_prompt() -> str:
+    """User memory block ("User:" + YAML), prepended to the new user message; empty if none."""
+    user_yaml = load_user_memory_yaml()
+    if not user_yaml:
+        return ""
+    return "User:\n" + user_yaml.strip()